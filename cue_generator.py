@@ -8,6 +8,8 @@ Usage:
 REM Genre GENRE
 
 00:00 ARTIST - TRACKTITLE
+- Timestamps are MM:SS or HH:MM:SS, minutes may exceed 99 in long mixes
+  (e.g. 100:12 ARTIST - TRACKTITLE)
 - In case the artist and track title are reversed, rename the file to
   tracklist_title_artist.txt
 - `python3 cue_generator.py /path/to/tracklist.txt` generates the .cue file
@@ -26,10 +28,20 @@ REM Genre GENRE
 """
 
 import os
+import re
 import sys
+from pathlib import Path
 
 ORDER_ARTIST_FIRST = True
 
+# Either a "Title: TITLE" line or a track line consisting of a MM:SS or
+# HH:MM:SS timestamp (any number of leading digits) followed by "STRING1 - STRING2"
+CUE_LINE_RE = re.compile(
+	r"^(?:#?[ \t]*Title:[ \t]*(?P<title>.+)"
+	r"|(?P<ts>\d+(?::\d{2}){1,2})[ \t]+(?P<a>.+?)(?:[ \t]+-[ \t]+(?P<b>.+))?)$",
+	re.MULTILINE
+)
+
 def get_tracklist_input_file():
 	try:
 		file_path = sys.argv[1]
@@ -40,80 +52,41 @@ def get_tracklist_input_file():
 	raise Exception("Can't find input file :(")
 
 def read_input_file(path):
-	with open(path, "r") as file:
-		# content = file.read()
-		
-		content = []
-		line = file.readline()
-		
-		while line:
-			line = line.replace("\n", "")
-			content.append(line)
-			line = file.readline()
-
-	return content
+	return Path(path).read_text(encoding="utf-8")
 
 def construct_output_file_path(input_path):
 	return ".".join(input_path.split(".")[:-1]) + ".cue"
 
-def is_timestamp(string):
-	for character in string:
-		if character.isdigit() or character == ":":
-			continue
-		return False
-	return True
-
-def get_min_sec_from_timestamp(timestamp_string):
-	digits = timestamp_string.split(":")
-	if len(digits) == 2:
-		return (int(digits[0]), int(digits[1]))
-	if len(digits) == 3:
-		return (int(digits[0])*60 + int(digits[1]), int(digits[2]))
-	raise Exception(f"Invalid timestamp: {timestamp_string}")
-
-def get_string1(full_line):
-	return full_line.split(" - ")[0].split(":")[-1][3:]
-
-def get_string2(full_line):
-	try:
-		return full_line.split(" - ")[1]
-	except:
-		return "UNKNOWN"
-
 def parse_input_file(contents):
 	track_counter = 1
-	return_string = ""
+	output        = []
 
-	for line in contents:
-		if line.startswith("Title:") or line.startswith("# Title:"):
-			return_string += f"TITLE \"{line.split("Title: ")[-1]}\"\n"
+	# All other lines (links, REM, empty lines, ...) are skipped by the regex
+	for m in CUE_LINE_RE.finditer(contents):
+		if m["title"] is not None:
+			output.append(f"TITLE \"{m['title']}\"\n")
 			continue
 
-		# Ignore empty line
-		if line == "":
-			continue
-
-		# This is possibly a timestamp
-		first_substring = line.split(" ")[0]
-		
-		# If this is a timestamp, convert it to a track record
-		if is_timestamp(first_substring):
-
-			artist = get_string1(line)
-			title  = get_string2(line)
-			if not ORDER_ARTIST_FIRST:
-				artist, title = title, artist
+		artist, title = m["a"], m["b"] or "UNKNOWN"
+		if not ORDER_ARTIST_FIRST:
+			artist, title = title, artist
 
-			minutes, seconds = get_min_sec_from_timestamp(first_substring)			
+		digits = [int(x) for x in m["ts"].split(":")]
+		if len(digits) == 2:
+			minutes, seconds = digits
+		else:
+			minutes, seconds = digits[0]*60 + digits[1], digits[2]
 
-			return_string += f"  TRACK {str(track_counter).zfill(2)} AUDIO\n"
-			return_string += f"    TITLE \"{title}\"\n"
-			return_string += f"    PERFORMER \"{artist}\"\n"
-			return_string += f"    INDEX 01 {str(minutes).zfill(2)}:{str(seconds).zfill(2)}\n"
+		output.append(
+			f"  TRACK {track_counter:02d} AUDIO\n"
+			f"    TITLE \"{title}\"\n"
+			f"    PERFORMER \"{artist}\"\n"
+			f"    INDEX 01 {minutes:02d}:{seconds:02d}\n"
+		)
 
-			track_counter += 1
+		track_counter += 1
 
-	return return_string
+	return "".join(output)
 	
 
 if __name__ == "__main__":
@@ -17,14 +17,20 @@ What it does:
 - By default converts to `m4a` (ALAC) which is fully supported by iTunes.
   You can change --output-format to "flac" or "wav" if you prefer. For WAV,
   tags are limited; prefer m4a or flac for reliable metadata.
+- With --inplace (requires mutagen), files that keep their format (e.g. m4a in,
+  m4a out) are tagged and renamed in place instead of being remuxed by ffmpeg.
 """
 
 import argparse
+import codecs
+import fnmatch
 import re
 import shlex
 import subprocess
 import sys
+import tempfile
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
@@ -34,6 +40,27 @@ from typing import Dict, List, Optional, Tuple
 # * 002_Song Title.mp3
 TRACK_PREFIX_RE = re.compile(r'^\s*0*(\d{1,3})\s*[-_.\s]+\s*(.+)$')
 
+# Tokens of a .cue line, either "quoted strings" or bare words
+CUE_TOKEN_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+# .cue keys handled by parse_cue, all other lines are skipped
+CUE_RELEVANT_KEYS = {'REM', 'PERFORMER', 'TITLE', 'FILE', 'TRACK', 'INDEX'}
+
+# Characters that need a backslash escape in ffmetadata values
+FFMETADATA_ESCAPE_RE = re.compile(r'[=;#\\\n]')
+
+# Formats that can be tagged in place using mutagen (see --inplace)
+INPLACE_SUFFIXES = {'.m4a', '.mp4', '.flac', '.mp3'}
+
+# ffmpeg metadata keys that are named differently in mutagen's easy interface
+INPLACE_TAG_KEYS = {'track': 'tracknumber'}
+
+# Default number of ffmpeg processes running in parallel
+DEFAULT_JOBS = min(8, os.cpu_count() or 1)
+
+# Characters that are problematic in filenames
+SANITIZE_RE = re.compile(r'[\/\?%:\*\|"<>\u0000-\u001F]+')
+
 def parse_cue(
     cue_path: Path
 ) -> Dict:
@@ -51,54 +78,69 @@ def parse_cue(
     tracks        = []
     current_track = None
 
-    with cue_path.open("r", encoding="utf-8", errors="ignore") as f:
+    # Read raw bytes and decode once, dropping a UTF-8 BOM (common on Windows)
+    # Older cue files are often Latin-1, which is used if UTF-8 decoding fails
+    raw = cue_path.read_bytes()
+    if raw.startswith(codecs.BOM_UTF8):
+        raw = raw[len(codecs.BOM_UTF8):]
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError:
+        text = raw.decode("latin-1")
 
-        for raw in f:
+    for line in text.splitlines():
 
-            line = raw.strip()
-            if not line:
-                continue
+        line = line.strip()
+        if not line:
+            continue
 
-            parts = shlex.split(line) if '"' in line else line.split(maxsplit=2)
-            key   = parts[0].upper()
+        # Peek at the key first, ignored lines (FLAGS, ISRC, ...) aren't tokenized
+        head, *rest = line.split(None, 1)
+        key         = head.upper()
+        if key not in CUE_RELEVANT_KEYS:
+            continue
 
-            if key == "REM":
-                # store remainder as REM key/value
-                if len(parts) >= 3:
-                    # REM GENRE "Rock" or REM DATE 1995
-                    album["REM"][parts[1]] = parts[2].strip('"')
-                continue
+        parts = [head] + [
+            m.group(1) if m.group(1) is not None else m.group(2) 
+            for m in CUE_TOKEN_RE.finditer(rest[0] if rest else '')
+        ]
+
+        if key == "REM":
+            # store remainder as REM key/value
+            if len(parts) >= 3:
+                # REM GENRE "Rock" or REM DATE 1995
+                album["REM"][parts[1]] = " ".join(parts[2:])
+            continue
 
-            if key == "PERFORMER" and current_track is None:
-                # album-level performer
-                album["PERFORMER"] = line.partition(' ')[2].strip().strip('"')
-
-            elif key == "TITLE" and current_track is None:
-                album["TITLE"] = line.partition(' ')[2].strip().strip('"')
-
-            elif key == "FILE":
-                # FILE "name.wav" WAVE
-                m = re.search(r'\"([^\"]+)\"', line)
-                album["FILE"] = m.group(1) if m else parts[1].strip('"')
-
-            elif key == "TRACK":
-                # begin new track block
-                if current_track:
-                    tracks.append(current_track)
-                num = int(parts[1])
-                current_track = {
-                    "number":    num, 
-                    "TITLE":     None, 
-                    "PERFORMER": None, 
-                    "INDEX":     None
-                }
-
-            elif key == "PERFORMER" and current_track is not None:
-                current_track["PERFORMER"] = line.partition(' ')[2].strip().strip('"')
-            elif key == "TITLE" and current_track is not None:
-                current_track["TITLE"] = line.partition(' ')[2].strip().strip('"')
-            elif key == "INDEX" and current_track is not None:
-                current_track["INDEX"] = parts[1:]
+        if key == "PERFORMER" and current_track is None:
+            # album-level performer
+            album["PERFORMER"] = " ".join(parts[1:])
+
+        elif key == "TITLE" and current_track is None:
+            album["TITLE"] = " ".join(parts[1:])
+
+        elif key == "FILE":
+            # FILE "name.wav" WAVE
+            album["FILE"] = parts[1]
+
+        elif key == "TRACK":
+            # begin new track block
+            if current_track:
+                tracks.append(current_track)
+            num = int(parts[1])
+            current_track = {
+                "number":    num, 
+                "TITLE":     None, 
+                "PERFORMER": None, 
+                "INDEX":     None
+            }
+
+        elif key == "PERFORMER" and current_track is not None:
+            current_track["PERFORMER"] = " ".join(parts[1:])
+        elif key == "TITLE" and current_track is not None:
+            current_track["TITLE"] = " ".join(parts[1:])
+        elif key == "INDEX" and current_track is not None:
+            current_track["INDEX"] = parts[1:]
 
     if current_track:
         tracks.append(current_track)
@@ -107,58 +149,133 @@ def parse_cue(
 
 
 
-def find_track_file(
-    tracks_dir: Path, 
-    track_num:  int, 
+def scan_tracks_dir(
+    tracks_dir: Path,
     pattern:    str
-) -> Optional[Path]:
+) -> List[Tuple[str, str]]:
 
     """
-    Search tracks_dir for a file that starts with the track number or contains the padded num.
+    List (name, path) of all files in tracks_dir matching pattern, in one pass.
+    Patterns with directory parts (e.g. "sub/*.wav" or "**/*.wav") need a
+    recursive glob, all others are matched against a flat os.scandir listing.
     """
 
-    padded = f"{track_num:02d}"
-    candidates = list(tracks_dir.glob(pattern))
+    if '/' in pattern or os.sep in pattern:
+        return [(path.name, str(path)) for path in tracks_dir.glob(pattern)]
+
+    with os.scandir(tracks_dir) as it:
+        return [
+            (entry.name, entry.path) 
+            for entry in it 
+            if fnmatch.fnmatch(entry.name, pattern)
+        ]
+
+
+
+def index_track_files(
+    entries: List[Tuple[str, str]]
+) -> Tuple[Dict[int, str], List[Tuple[str, str]]]:
+
+    """
+    Map track number -> path for entries starting with a track number.
+    Entries without a numeric prefix are returned separately as unmatched.
+    """
+
+    index     = {}
+    unmatched = []
+
+    for name, path in entries:
+        m = TRACK_PREFIX_RE.match(name)
+        if m:
+            index.setdefault(int(m.group(1)), path)
+        else:
+            unmatched.append((name, path))
+
+    return index, unmatched
+
+
+
+def find_track_file(
+    index:     Dict[int, str], 
+    unmatched: List[Tuple[str, str]], 
+    n_files:   int, 
+    track_num: int
+) -> Optional[Path]:
+
+    """
+    Look up the file that starts with the track number or contains the padded num.
+    """
 
     # Prefer files that start with the number
-    for candidate in candidates:
-        m = TRACK_PREFIX_RE.match(candidate.name)
-        if m and int(m.group(1)) == track_num:
-            return candidate
+    found = index.get(track_num)
+    if found is not None:
+        return Path(found)
 
-    # Otherwise look for padded number anywhere in name
-    for candidate in candidates:
-        if padded in candidate.name:
-            return candidate
+    # Otherwise look for padded number anywhere in the remaining names
+    padded = f"{track_num:02d}"
+    for name, path in unmatched:
+        if padded in name:
+            return Path(path)
 
-    # Lastly, if there is exactly one file and only one track, return it
-    if len(candidates) == 1 and len(list(tracks_dir.glob(pattern))) == 1:
-        return candidates[0]
+    # Lastly, if there is exactly one file, return it
+    # (n_files counts all files, index collapses files sharing a track number)
+    if n_files == 1:
+        return Path(next(iter(index.values())) if index else unmatched[0][1])
 
     return None
 
 
 
+def write_ffmetadata(
+    directory: Path, 
+    tags:      Dict[str, str]
+) -> Path:
+
+    """
+    Write tags to a temporary ffmetadata file in directory and return its path.
+    """
+
+    lines = [';FFMETADATA1']
+    for key, value in tags.items():
+        if value is None:
+            continue
+        escaped = FFMETADATA_ESCAPE_RE.sub(r'\\\g<0>', str(value))
+        lines.append(f'{key}={escaped}')
+
+    with tempfile.NamedTemporaryFile(
+        'w', 
+        encoding = 'utf-8', 
+        suffix   = '.ffmetadata', 
+        dir      = directory, 
+        delete   = False
+    ) as f:
+        f.write('\n'.join(lines) + '\n')
+
+    return Path(f.name)
+
+
+
 def build_ffmpeg_command(
-    input_path:  Path, 
-    output_path: Path, 
-    tags:        Dict[str, str], 
-    copy_audio:  bool = True
+    input_path:    Path, 
+    output_path:   Path, 
+    metadata_path: Path, 
+    copy_audio:    bool = True
 ) -> List[str]:
     
     """
-    Construct ffmpeg command for embedding metadata.
+    Construct ffmpeg command for embedding metadata from an ffmetadata file.
     - copy_audio: if True, use -c:a copy when converting between containers that support metadata;
                   otherwise fallback to encoding (not done by default).
     """
 
-    cmd = ["ffmpeg", "-y", "-i", str(input_path)]
-
-    # Metadata
-    for key, value in tags.items():
-        if value is None:
-            continue
-        cmd += ['-metadata', f'{key}={value}']
+    # Keep ffmpeg quiet so only actual errors end up in the captured stderr
+    cmd = [
+        "ffmpeg", "-y", 
+        "-loglevel", "error", "-nostats", "-hide_banner", 
+        "-i", str(input_path), 
+        "-i", str(metadata_path), 
+        "-map_metadata", "1"
+    ]
 
     # Choose codec behavior: try to copy audio to be fast and lossless when possible
     if copy_audio:
@@ -176,13 +293,108 @@ def sanitize_filename(
 ) -> str:
 
     # Remove problematic chars for filenames and trim spaces
-    return re.sub(r'[\/\?%:\*\|"<>\u0000-\u001F]+', '', name).strip()
+    return SANITIZE_RE.sub('', name).strip()
+
+
+
+def run_ffmpeg(
+    input_path:  Path, 
+    output_path: Path, 
+    tags:        Dict[str, str]
+) -> List[str]:
+
+    """
+    Run ffmpeg for a single track, falling back to ALAC encoding if copying fails.
+    Returns the log lines so that concurrent runs don't interleave their output.
+    """
+
+    log           = []
+    metadata_path = write_ffmetadata(output_path.parent, tags)
+
+    try:
+        cmd = build_ffmpeg_command(input_path, output_path, metadata_path, copy_audio=True)
+        log.append('Running ffmpeg: ' + ' '.join(shlex.quote(p) for p in cmd))
+        try:
+            subprocess.run(cmd, check=True, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except subprocess.CalledProcessError as e:
+            log.append(f'ffmpeg failed with exit code {e.returncode}')
+            log.append(e.stderr.decode(errors='ignore'))
+            # Try fallback: convert to m4a with ALAC encoding (if copy failed)
+            log.append('Attempting fallback: encode to m4a (alac) with metadata')
+            fallback = build_ffmpeg_command(input_path, output_path, metadata_path, copy_audio=False)
+            log.append('Running: ' + ' '.join(shlex.quote(p) for p in fallback))
+            try:
+                subprocess.run(fallback, check=True, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            except subprocess.CalledProcessError as e2:
+                log.append('Fallback also failed. Skipping this track. Error output:')
+                log.append(e2.stderr.decode(errors='ignore') if e2.stderr else 'no stderr')
+                return log
+    finally:
+        metadata_path.unlink(missing_ok=True)
+
+    # if ffmpeg succeeded, optionally remove the original if extension changed
+    if output_path.exists():
+        # if output path same as input (unlikely), nothing to do
+        if output_path.resolve() != input_path.resolve():
+            # delete original if you want; here we keep original and optionally you can uncomment to remove
+            # found.unlink()
+            pass
+        log.append(f'Wrote: {output_path}')
+
+    return log
+
+
+
+def tag_inplace(
+    input_path:  Path, 
+    output_path: Path, 
+    tags:        Dict[str, str]
+) -> List[str]:
 
+    """
+    Write tags directly into input_path using mutagen and rename it to output_path.
+    This avoids reading and rewriting the whole audio stream like ffmpeg does.
+    Falls back to run_ffmpeg if mutagen can't handle the file.
+    """
 
+    import mutagen
 
-def process(cue_file: Path, tracks_dir: Path, pattern: str = '*.*', output_format: Optional[str] = 'm4a', dry_run: bool = False):
+    # Never overwrite another file, process() already keeps other jobs off these paths
+    same_file = os.path.abspath(output_path).casefold() == os.path.abspath(input_path).casefold()
+    if not same_file and output_path.exists():
+        return [f'Not tagging {input_path.name} in place: {output_path} already exists. Skipping this track.']
+
+    try:
+        audio = mutagen.File(input_path, easy=True)
+        if audio is None:
+            raise mutagen.MutagenError(f'unsupported file: {input_path.name}')
+        if audio.tags is None:
+            audio.add_tags()
+        for key, value in tags.items():
+            if value is None:
+                continue
+            audio[INPLACE_TAG_KEYS.get(key, key)] = str(value)
+        audio.save()
+    except (mutagen.MutagenError, KeyError, ValueError, OSError) as e:
+        return [f'In-place tagging failed ({e}), falling back to ffmpeg'] + run_ffmpeg(input_path, output_path, tags)
+
+    if output_path != input_path:
+        try:
+            os.replace(input_path, output_path)
+        except OSError as e:
+            return [f'Tagged {input_path} in place, but renaming to {output_path.name} failed: {e}']
+
+    return [f'Tagged in place: {output_path}']
+
+
+
+def process(cue_file: Path, tracks_dir: Optional[Path] = None, pattern: str = '*.*', output_format: Optional[str] = 'm4a', dry_run: bool = False, max_jobs: int = DEFAULT_JOBS, inplace: bool = False):
     if not cue_file.exists():
         raise FileNotFoundError(f"cue file not found: {cue_file}")
+    # By default the tracks are expected in the "tracks" folder next to the cue file
+    tracks_dir = tracks_dir or (cue_file.parent / 'tracks')
+    if not tracks_dir.is_dir():
+        raise FileNotFoundError(f"tracks directory not found: {tracks_dir} (use --tracks-dir)")
     meta = parse_cue(cue_file)
     album = meta['album']
     tracks = meta['tracks']
@@ -190,45 +402,61 @@ def process(cue_file: Path, tracks_dir: Path, pattern: str = '*.*', output_forma
     print(f'Parsed album: {album.get("TITLE")!r} by {album.get("PERFORMER")!r}')
     print(f'Found {len(tracks)} tracks in cue. Scanning folder: {tracks_dir} with pattern {pattern}')
 
+    # Output extension and track count don't change between tracks
+    fixed_ext = f'.{output_format}' if output_format and not output_format.startswith('.') else (output_format or None)
+    n_tracks  = len(tracks)
+
+    if inplace:
+        try:
+            import mutagen  # noqa: F401
+        except ImportError:
+            print('WARN: --inplace requires mutagen (pip install mutagen), using ffmpeg instead')
+            inplace = False
+
+    entries          = scan_tracks_dir(tracks_dir, pattern)
+    index, unmatched = index_track_files(entries)
+    jobs             = []
+    log              = []
+    claimed          = set()
+
     for t in tracks:
         tn         = t['number']
         ttitle     = t.get('TITLE') or f'Track {tn}'
         tperformer = t.get('PERFORMER') or album.get('PERFORMER')
 
-        found = find_track_file(tracks_dir, tn, pattern)
-        if not found:
-            # Alternative search path
-            found = find_track_file(
-                Path(os.path.dirname(cue_file) + "/tracks"),
-                tn,
-                pattern
-            )
+        found = find_track_file(index, unmatched, len(entries), tn)
 
         if not found:
-            print(f'WARN: No file found for track {tn:02d} - "{ttitle}"')
+            log.append(f'WARN: No file found for track {tn:02d} - "{ttitle}"')
             continue
-        print(f'Found file for track {tn:02d}: {found.name}')
+        log.append(f'Found file for track {tn:02d}: {found.name}')
 
         # new base name -> remove leading number
         # e.g. "01 - Foo.wav" -> "Foo.m4a" (output format applied)
-        base_title = re.sub(r'^\s*0*%d\s*[-_.\s]+' % tn, '', found.name, flags=re.IGNORECASE)
-        
-        # if above didn't match, also try to strip a leading "01 " without delimiter
-        base_title = re.sub(r'^\s*0*%d\s+' % tn, '', base_title, flags=re.IGNORECASE)
+        m = TRACK_PREFIX_RE.match(found.name)
+        base_title = m.group(2) if m and int(m.group(1)) == tn else found.name
         
         # remove extension then sanitize and add new extension
-        stem = Path(base_title).stem if Path(base_title).stem else ttitle
-        stem = sanitize_filename(stem or ttitle)
-        out_ext = output_format if output_format.startswith('.') else f'.{output_format}' if output_format else found.suffix
-        out_name = f"{stem}{out_ext}"
+        stem = sanitize_filename(base_title.rsplit('.', 1)[0] or ttitle)
+        out_name = f"{stem}{fixed_ext or found.suffix}"
         output_path = found.with_name(out_name)
 
+        # Jobs run in parallel, so no two of them may read or write the same file
+        # (e.g. the single-file fallback or two tracks sanitizing to the same name).
+        # Case is ignored as macOS file systems are case-insensitive by default.
+        in_key  = os.path.abspath(found).casefold()
+        out_key = os.path.abspath(output_path).casefold()
+        if in_key in claimed or (out_key != in_key and out_key in claimed):
+            log.append(f'WARN: Skipping track {tn:02d} - "{ttitle}": {found.name} -> {output_path.name} collides with an earlier track')
+            continue
+        claimed.update((in_key, out_key))
+
         # build metadata dict for ffmpeg - keys are ffmpeg metadata keys
         tags = {
             'title': ttitle,
             'artist': tperformer,
             'album': album.get('TITLE'),
-            'track': f"{tn}/{len(tracks)}" if len(tracks)>0 else str(tn),
+            'track': f"{tn}/{n_tracks}",
         }
         # optional REM metadata
         if 'DATE' in album.get('REM', {}):
@@ -236,41 +464,23 @@ def process(cue_file: Path, tracks_dir: Path, pattern: str = '*.*', output_forma
         if 'GENRE' in album.get('REM', {}):
             tags['genre'] = album['REM']['GENRE']
 
-        print(f"--> Will write: {output_path.name} | tags: title='{tags['title']}', artist='{tags['artist']}', track='{tags['track']}'")
-        if dry_run:
-            continue
+        log.append(f"--> Will write: {output_path.name} | tags: title='{tags['title']}', artist='{tags['artist']}', track='{tags['track']}'")
+        # Tag in place if the container stays the same and mutagen supports it
+        suffix = found.suffix.lower()
+        worker = tag_inplace if inplace and suffix == output_path.suffix.lower() and suffix in INPLACE_SUFFIXES else run_ffmpeg
+        jobs.append((worker, found, output_path, tags))
 
-        # build and run ffmpeg command
-        cmd = build_ffmpeg_command(found, output_path, tags, copy_audio=True)
-        print('Running ffmpeg:', ' '.join(shlex.quote(p) for p in cmd))
-        try:
-            res = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        except subprocess.CalledProcessError as e:
-            print('ffmpeg failed with exit code', e.returncode)
-            print(e.stderr.decode(errors='ignore'))
-            # Try fallback: convert to m4a with ALAC encoding (if copy failed)
-            print('Attempting fallback: encode to m4a (alac) with metadata')
-            fallback = ['ffmpeg', '-y', '-i', str(found)]
-            for k, v in tags.items():
-                if v is None: continue
-                fallback += ['-metadata', f"{k}={v}"]
-            fallback += ['-c:a', 'alac', str(output_path)]
-            print('Running:', ' '.join(shlex.quote(p) for p in fallback))
-            try:
-                subprocess.run(fallback, check=True)
-            except subprocess.CalledProcessError as e2:
-                print('Fallback also failed. Skipping this track. Error output:')
-                print(e2.stderr.decode(errors='ignore') if e2.stderr else 'no stderr')
-                continue
+    # Output is buffered and written in one go instead of one print per step
+    if log:
+        sys.stdout.write('\n'.join(log) + '\n')
 
-        # if ffmpeg succeeded, optionally remove the original if extension changed
-        if output_path.exists():
-            # if output path same as input (unlikely), nothing to do
-            if output_path.resolve() != found.resolve():
-                # delete original if you want; here we keep original and optionally you can uncomment to remove
-                # found.unlink()
-                pass
-            print(f'Wrote: {output_path}')
+    if not dry_run and jobs:
+        # ffmpeg runs in child processes, so threads are enough to overlap tracks.
+        # Logs are written in track order by this thread once each job has finished.
+        with ThreadPoolExecutor(max_workers=max(1, max_jobs)) as executor:
+            futures = [executor.submit(*job) for job in jobs]
+            for future in futures:
+                sys.stdout.write('\n'.join(future.result()) + '\n')
 
     print('All done. Review files in:', tracks_dir)
 
@@ -278,14 +488,16 @@ def process(cue_file: Path, tracks_dir: Path, pattern: str = '*.*', output_forma
 def main():
     p = argparse.ArgumentParser(description='Tag and rename split tracks using a .cue file and ffmpeg.')
     p.add_argument('cue',             type=Path,                    help='Path to the .cue file')
-    p.add_argument('--tracks-dir',    type=Path, default=Path('.'), help='Directory containing split tracks (default: current dir)')
+    p.add_argument('--tracks-dir',    type=Path, default=None,      help='Directory containing split tracks (default: "tracks" next to the cue file)')
     p.add_argument('--pattern',       type=str,  default='*.*',     help='Glob pattern to find audio files (default: "*.*" )')
     p.add_argument('--output-format', type=str,  default='m4a',     help='Output file extension (m4a, flac, wav, mp3). Default: m4a (Apple Lossless)')
+    p.add_argument('--jobs',          type=int,  default=DEFAULT_JOBS, help=f'Number of ffmpeg processes to run in parallel (default: {DEFAULT_JOBS})')
+    p.add_argument('--inplace', action='store_true',                help=f'Tag files in place with mutagen and rename them instead of remuxing with ffmpeg, if the format stays the same ({", ".join(sorted(INPLACE_SUFFIXES))})')
     p.add_argument('--dry-run', action='store_true',                help='Show actions without running ffmpeg')
     args = p.parse_args()
 
     try:
-        process(args.cue, args.tracks_dir, args.pattern, args.output_format, args.dry_run)
+        process(args.cue, args.tracks_dir, args.pattern, args.output_format, args.dry_run, args.jobs, args.inplace)
     except Exception as e:
         print('Error:', e)
         sys.exit(1)